@@ -24,216 +24,407 @@ Endpoints tested:
   • Geolocate
 
 Usage:
-  python gmaps-keycheck.py
+  python gmaps-keycheck.py [--probe-only]
+
+  --probe-only  check Static Map / Street View with HEAD instead of
+                downloading the images
 """
 
-import sys, csv, json, time, hashlib, pathlib, subprocess, requests
+import io, sys, csv, logging, time, shutil, hashlib, pathlib, subprocess, requests, orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError
 from urllib3.util.retry import Retry
 from tqdm import tqdm
 
+log = logging.getLogger("gmaps-keycheck")
+
 GREEN, RED, RESET = "\033[92m", "\033[91m", "\033[0m"
+TIMEOUT = 10
+INDENT, WIDTH = 23, 80   # raw dumps sit under the Info column; one-line if they fit
+HOSTS = ("maps.googleapis.com", "roads.googleapis.com", "www.googleapis.com")
+KEY_REJECTED = (
+    "The provided API key is invalid",
+    "The provided API key is expired",
+    "not authorized to use this API key",     # IP, referer or app restriction
+    "API keys with referer restrictions cannot be used",
+)
 SERVICES = [
     "geocode", "batchgeocode", "staticmap", "streetview", "photoreference",
     "placedetails", "textsearch", "distancematrix", "elevation", "timezone",
     "nearbysearch", "autocomplete", "snaptoroads", "nearestroads", "geolocate"
 ]
 
-def make_session(retries=2, backoff=0.5, timeout=10):
+def make_session(retries=2, backoff=0.5):
     s = requests.Session()
     retry = Retry(total=retries, backoff_factor=backoff,
                   status_forcelist=[429,500,502,503,504],
-                  allowed_methods=["GET","POST"])
-    s.mount("https://", HTTPAdapter(max_retries=retry))
-    orig = s.request
-    def timed_request(m, u, **kw): return orig(m, u, timeout=timeout, **kw)
-    s.request = timed_request
+                  allowed_methods=["HEAD","GET","POST"])
+    # few hosts, many concurrent calls per host
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=0)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip, deflate"})
+    # open the pooled TLS connections up front so geocode doesn't pay for them;
+    # retries stay off until then so the 2 s warm-up timeout is the real cap
+    with ThreadPoolExecutor(max_workers=len(HOSTS)) as pool:
+        pool.map(lambda host: warm(s, host), HOSTS)
+    adapter.max_retries = retry
     return s
 
-def mask_key(key):
-    h = hashlib.sha1(key.encode()).hexdigest()[:8]
-    return f"{key[:4]}…{key[-4:]} ({h})"
+def warm(session, host):
+    try:
+        session.head(f"https://{host}/", allow_redirects=False, timeout=2)
+    except requests.RequestException:
+        log.debug("warming %s failed", host, exc_info=True)
+
+def mask_key(key, hash8):
+    return f"{key[:4]}…{key[-4:]} ({hash8})"
 
 def fetch_json(session, method, url, **kw):
     try:
-        r = getattr(session, method)(url, **kw)
-        return r.status_code, r.json()
-    except:
+        r = session.request(method.upper(), url, timeout=TIMEOUT, **kw)
+    except requests.RequestException:
+        log.debug("%s %s failed", method.upper(), url, exc_info=True)
         return None, {}
+    try:
+        return r.status_code, orjson.loads(r.content) if r.content else {}
+    except orjson.JSONDecodeError:
+        return r.status_code, {}
 
-def fetch_image(session, url, params, dest):
+def fetch_image(session, url, params, dest, probe_only=False):
     try:
-        r = session.get(url, params=params)
-        if r.status_code == 200:
-            dest.parent.mkdir(parents=True, exist_ok=True)
-            with open(dest, "wb") as f: f.write(r.content)
-            return True, r.status_code, r.headers
-        return False, r.status_code, r.headers
-    except:
+        if probe_only:
+            # headers are enough to tell whether the key works; skip the body
+            r = session.head(url, params=params, allow_redirects=True, timeout=TIMEOUT)
+            if r.status_code != 405:
+                return r.status_code == 200, r.status_code, r.headers
+        r = session.get(url, params=params, stream=True, timeout=TIMEOUT)
+        with r:
+            if r.status_code == 200:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                r.raw.decode_content = True
+                # stream into a side file so a broken download never replaces dest
+                part = dest.with_suffix(".part")
+                try:
+                    with open(part, "wb") as f: shutil.copyfileobj(r.raw, f, 64 * 1024)
+                    part.replace(dest)
+                finally:
+                    if part.exists(): part.unlink()
+                return True, r.status_code, r.headers
+            return False, r.status_code, r.headers
+    except (requests.RequestException, HTTPError, OSError, ValueError):
+        # r.raw is read directly, so urllib3 errors arrive unwrapped
+        log.debug("fetching %s failed", url, exc_info=True)
         return False, None, {}
 
-def test_key_place(session, key, place, out_root):
-    results, geo, pid = {}, None, None
-
-    for svc in tqdm(SERVICES, desc=f"Checking {place}", leave=False):
-        if svc == "geocode":
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/geocode/json",
-                params={"address": place, "key": key})
-            if js.get("status") == "OK":
-                addr = js["results"][0]["formatted_address"]
-                results["geocode"] = {"http": code, "info": addr, "raw": js}
-                loc = js["results"][0]["geometry"]["location"]
-                geo = f"{loc['lat']},{loc['lng']}"
-                pid = js["results"][0]["place_id"]
-
-        elif svc == "batchgeocode":
-            batch_csv = out_root / "batch.csv"
-            batch_csv.parent.mkdir(parents=True, exist_ok=True)
-            with open(batch_csv, "w", newline="") as f:
-                csv.writer(f).writerows([["address"], [place]])
-            code, js = fetch_json(session, "post",
-                "https://maps.googleapis.com/maps/api/geocode/batch/json",
-                files={"file": open(batch_csv, "rb")},
-                params={"key": key})
-            info = "" if code == 200 else js.get("status", "")
-            results["batchgeocode"] = {"http": code, "info": info, "raw": js}
-
-        elif svc == "staticmap" and geo:
-            ok, c, h = fetch_image(session,
-                "https://maps.googleapis.com/maps/api/staticmap",
-                {"center": geo, "zoom": 7, "size": "400x400", "key": key},
-                out_root/"staticmap.png")
-            if ok:
-                sz = int(h.get("Content-Length", 0)) // 1024
-                info = f"{h.get('Content-Type','')}, {sz}KB"
-                results["staticmap"] = {"http": c, "info": info, "raw": dict(h)}
-
-        elif svc == "streetview" and geo:
-            ok, c, h = fetch_image(session,
-                "https://maps.googleapis.com/maps/api/streetview",
-                {"location": geo, "size": "400x400", "key": key},
-                out_root/"streetview.jpg")
-            if ok:
-                sz = int(h.get("Content-Length", 0)) // 1024
-                info = f"{h.get('Content-Type','')}, {sz}KB"
-                results["streetview"] = {"http": c, "info": info, "raw": dict(h)}
-
-        elif svc == "photoreference" and pid:
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/place/findplacefromtext/json",
-                params={"input": place, "inputtype": "textquery", "fields": "photos", "key": key})
-            cands = js.get("candidates", [])
-            if cands and "photos" in cands[0]:
-                ref = cands[0]["photos"][0].get("photo_reference", "")
-                results["photoreference"] = {"http": code, "info": ref, "raw": js}
-
-        elif svc == "placedetails" and pid:
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/place/details/json",
-                params={"place_id": pid, "key": key})
-            if js.get("status") == "OK":
-                nm = js["result"].get("name", "")
-                results["placedetails"] = {"http": code, "info": nm, "raw": js}
-
-        elif svc == "textsearch":
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/place/textsearch/json",
-                params={"query": place, "key": key})
-            if js.get("results"):
-                nm = js["results"][0].get("name", "")
-                results["textsearch"] = {"http": code, "info": nm, "raw": js}
-
-        elif svc == "distancematrix" and geo:
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/distancematrix/json",
-                params={"origins": geo, "destinations": geo, "key": key})
-            rows = js.get("rows", [])
-            if rows and rows[0].get("elements", []):
-                el = rows[0]["elements"][0]
-                if "distance" in el:
-                    d = el["distance"]["text"]; t = el["duration"]["text"]
-                    results["distancematrix"] = {"http": code, "info": f"{d}, {t}", "raw": js}
-
-        elif svc == "elevation" and geo:
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/elevation/json",
-                params={"locations": geo, "key": key})
-            rs = js.get("results", [])
-            if rs:
-                e = rs[0].get("elevation", "")
-                results["elevation"] = {"http": code, "info": f"{e}m", "raw": js}
-
-        elif svc == "timezone" and geo:
-            ts = int(time.time())
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/timezone/json",
-                params={"location": geo, "timestamp": ts, "key": key})
-            tz = js.get("timeZoneId", "")
-            if tz:
-                results["timezone"] = {"http": code, "info": tz, "raw": js}
-
-        elif svc == "nearbysearch" and geo:
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/place/nearbysearch/json",
-                params={"location": geo, "radius": 1000, "type": "restaurant", "key": key})
-            if js.get("results"):
-                nm = js["results"][0].get("name", "")
-                results["nearbysearch"] = {"http": code, "info": nm, "raw": js}
-
-        elif svc == "autocomplete":
-            prefix = place.split()[0]
-            code, js = fetch_json(session, "get",
-                "https://maps.googleapis.com/maps/api/place/autocomplete/json",
-                params={"input": prefix, "types": "geocode", "key": key})
-            preds = js.get("predictions", [])
-            if preds:
-                desc = preds[0].get("description", "")
-                results["autocomplete"] = {"http": code, "info": desc, "raw": js}
-
-        elif svc == "snaptoroads" and geo:
-            code, js = fetch_json(session, "get",
-                "https://roads.googleapis.com/v1/snapToRoads",
-                params={"path": f"{geo}|{geo}", "interpolate": True, "key": key})
-            pts = len(js.get("snappedPoints", []))
-            if pts:
-                results["snaptoroads"] = {"http": code, "info": f"{pts} points", "raw": js}
-
-        elif svc == "nearestroads" and geo:
-            code, js = fetch_json(session, "get",
-                "https://roads.googleapis.com/v1/nearestRoads",
-                params={"points": geo, "key": key})
-            pts = len(js.get("snappedPoints", []))
-            if pts:
-                results["nearestroads"] = {"http": code, "info": f"{pts} points", "raw": js}
-
-        elif svc == "geolocate":
-            code, js = fetch_json(session, "post",
-                "https://www.googleapis.com/geolocation/v1/geolocate",
-                params={"key": key}, json={"considerIp": True})
-            loc = js.get("location", {})
-            if loc.get("lat") is not None:
-                info = f"{loc['lat']},{loc['lng']}"
-            else:
-                info = js.get("error", js.get("status", "UNKNOWN"))
-            results["geolocate"] = {"http": code, "info": info, "raw": js}
-
-    return results
-
-def print_table(key, place, results):
-    print(f"\nKey {mask_key(key)}  Place \"{place}\"")
+def place_hash(place):
+    return hashlib.sha1(place.lower().strip().encode()).hexdigest()
+
+def load_geocache(out_root):
+    # out_root is per key, so entries are effectively keyed by (key, place)
+    try:
+        cache = orjson.loads((out_root / ".geocache.json").read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def save_geocache(out_root, cache):
+    out_root.mkdir(parents=True, exist_ok=True)
+    (out_root / ".geocache.json").write_bytes(orjson.dumps(cache))
+
+@dataclass
+class Ctx:
+    session: requests.Session
+    key: str
+    place: str
+    out_root: pathlib.Path
+    geo: str = None
+    pid: str = None
+    denied: str = None
+    probe_only: bool = False
+    results: dict = field(default_factory=dict)
+
+HANDLERS = {}
+
+def handler(svc, deps=()):
+    """Register fn as the check for svc; deps name Ctx fields it needs set."""
+    def register(fn):
+        fn.deps = deps
+        HANDLERS[svc] = fn
+        return fn
+    return register
+
+@handler("geocode")
+def _do_geocode(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/geocode/json",
+        params={"address": ctx.place, "key": ctx.key})
+    if js.get("status") == "OK":
+        top = js["results"][0]
+        loc = top["geometry"]["location"]
+        ctx.geo = f"{loc['lat']},{loc['lng']}"
+        ctx.pid = top["place_id"]
+        return {"http": code, "info": top["formatted_address"], "raw": js}
+    # only denials about the key as a whole stop the sweep; "This API key is not
+    # authorized to use this service or API" means the key is limited to other
+    # APIs, which still need checking
+    msg = js.get("error_message", "")
+    key_rejected = (js.get("status") == "REQUEST_DENIED"
+                    and any(p in msg for p in KEY_REJECTED)
+                    and "not authorized to use this service or API" not in msg)
+    if code in (401, 403) or key_rejected:
+        ctx.denied = msg or f"HTTP {code}"
+        return {"http": code, "info": js.get("status", ""), "raw": js}
+    return None
+
+@handler("batchgeocode")
+def _do_batchgeocode(ctx):
+    buf = io.StringIO(newline="")
+    csv.writer(buf).writerows([["address"], [ctx.place]])
+    code, js = fetch_json(ctx.session, "post",
+        "https://maps.googleapis.com/maps/api/geocode/batch/json",
+        files={"file": ("batch.csv", buf.getvalue().encode(), "text/csv")},
+        params={"key": ctx.key})
+    info = "" if code == 200 else js.get("status", "")
+    return {"http": code, "info": info, "raw": js}
+
+@handler("staticmap", deps=("geo",))
+def _do_staticmap(ctx):
+    ok, c, h = fetch_image(ctx.session,
+        "https://maps.googleapis.com/maps/api/staticmap",
+        {"center": ctx.geo, "zoom": 7, "size": "400x400", "key": ctx.key},
+        ctx.out_root/"staticmap.png", ctx.probe_only)
+    if ok:
+        sz = int(h.get("Content-Length", 0)) // 1024
+        info = f"{h.get('Content-Type','')}, {sz}KB"
+        raw = {"Content-Type": h.get("Content-Type"), "Content-Length": h.get("Content-Length")}
+        return {"http": c, "info": info, "raw": raw}
+    return None
+
+@handler("streetview", deps=("geo",))
+def _do_streetview(ctx):
+    ok, c, h = fetch_image(ctx.session,
+        "https://maps.googleapis.com/maps/api/streetview",
+        {"location": ctx.geo, "size": "400x400", "key": ctx.key},
+        ctx.out_root/"streetview.jpg", ctx.probe_only)
+    if ok:
+        sz = int(h.get("Content-Length", 0)) // 1024
+        info = f"{h.get('Content-Type','')}, {sz}KB"
+        raw = {"Content-Type": h.get("Content-Type"), "Content-Length": h.get("Content-Length")}
+        return {"http": c, "info": info, "raw": raw}
+    return None
+
+@handler("photoreference", deps=("pid",))
+def _do_photoreference(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/place/findplacefromtext/json",
+        params={"input": ctx.place, "inputtype": "textquery", "fields": "photos", "key": ctx.key})
+    cands = js.get("candidates", [])
+    if cands and "photos" in cands[0]:
+        ref = cands[0]["photos"][0].get("photo_reference", "")
+        return {"http": code, "info": ref, "raw": js}
+    return None
+
+@handler("placedetails", deps=("pid",))
+def _do_placedetails(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/place/details/json",
+        params={"place_id": ctx.pid, "key": ctx.key})
+    if js.get("status") == "OK":
+        nm = js["result"].get("name", "")
+        return {"http": code, "info": nm, "raw": js}
+    return None
+
+@handler("textsearch")
+def _do_textsearch(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/place/textsearch/json",
+        params={"query": ctx.place, "key": ctx.key})
+    if js.get("results"):
+        nm = js["results"][0].get("name", "")
+        return {"http": code, "info": nm, "raw": js}
+    return None
+
+@handler("distancematrix", deps=("geo",))
+def _do_distancematrix(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/distancematrix/json",
+        params={"origins": ctx.geo, "destinations": ctx.geo, "key": ctx.key})
+    rows = js.get("rows", [])
+    if rows and rows[0].get("elements", []):
+        el = rows[0]["elements"][0]
+        if "distance" in el:
+            d = el["distance"]["text"]; t = el["duration"]["text"]
+            return {"http": code, "info": f"{d}, {t}", "raw": js}
+    return None
+
+@handler("elevation", deps=("geo",))
+def _do_elevation(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/elevation/json",
+        params={"locations": ctx.geo, "key": ctx.key})
+    rs = js.get("results", [])
+    if rs:
+        e = rs[0].get("elevation", "")
+        return {"http": code, "info": f"{e}m", "raw": js}
+    return None
+
+@handler("timezone", deps=("geo",))
+def _do_timezone(ctx):
+    ts = time.time_ns() // 1_000_000_000
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/timezone/json",
+        params={"location": ctx.geo, "timestamp": ts, "key": ctx.key})
+    tz = js.get("timeZoneId", "")
+    if tz:
+        return {"http": code, "info": tz, "raw": js}
+    return None
+
+@handler("nearbysearch", deps=("geo",))
+def _do_nearbysearch(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/place/nearbysearch/json",
+        params={"location": ctx.geo, "radius": 1000, "type": "restaurant", "key": ctx.key})
+    if js.get("results"):
+        nm = js["results"][0].get("name", "")
+        return {"http": code, "info": nm, "raw": js}
+    return None
+
+@handler("autocomplete")
+def _do_autocomplete(ctx):
+    prefix = ctx.place.split()[0]
+    code, js = fetch_json(ctx.session, "get",
+        "https://maps.googleapis.com/maps/api/place/autocomplete/json",
+        params={"input": prefix, "types": "geocode", "key": ctx.key})
+    preds = js.get("predictions", [])
+    if preds:
+        desc = preds[0].get("description", "")
+        return {"http": code, "info": desc, "raw": js}
+    return None
+
+@handler("snaptoroads", deps=("geo",))
+def _do_snaptoroads(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://roads.googleapis.com/v1/snapToRoads",
+        params={"path": f"{ctx.geo}|{ctx.geo}", "interpolate": True, "key": ctx.key})
+    pts = len(js.get("snappedPoints", []))
+    if pts:
+        return {"http": code, "info": f"{pts} points", "raw": js}
+    return None
+
+@handler("nearestroads", deps=("geo",))
+def _do_nearestroads(ctx):
+    code, js = fetch_json(ctx.session, "get",
+        "https://roads.googleapis.com/v1/nearestRoads",
+        params={"points": ctx.geo, "key": ctx.key})
+    pts = len(js.get("snappedPoints", []))
+    if pts:
+        return {"http": code, "info": f"{pts} points", "raw": js}
+    return None
+
+@handler("geolocate")
+def _do_geolocate(ctx):
+    code, js = fetch_json(ctx.session, "post",
+        "https://www.googleapis.com/geolocation/v1/geolocate",
+        params={"key": ctx.key}, json={"considerIp": True})
+    loc = js.get("location", {})
+    if loc.get("lat") is not None:
+        info = f"{loc['lat']},{loc['lng']}"
+    else:
+        info = js.get("error", js.get("status", "UNKNOWN"))
+    return {"http": code, "info": info, "raw": js}
+
+def test_key_place(session, key, place, out_root, probe_only=False):
+    ctx = Ctx(session, key, place, out_root, probe_only=probe_only)
+    out_root.mkdir(parents=True, exist_ok=True)
+    run = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    with tqdm(total=len(SERVICES), desc=f"Checking {place}", leave=False,
+              miniters=1, mininterval=0.1) as bar, \
+         open(out_root / "results.jsonl", "ab") as out:
+
+        def record(svc, r):
+            # stream each result as it lands instead of waiting for the sweep
+            ctx.results[svc] = r
+            rec = {"run": run, "place": place, "svc": svc, "result": r}
+            out.write(orjson.dumps(rec) + b"\n"); out.flush()
+            tqdm.write(format_row(svc, r))
+
+        def reject_rest():
+            for svc in SERVICES[1:]:
+                record(svc, {"http": None, "info": "skipped (key rejected)", "raw": None})
+
+        cache, ck = load_geocache(out_root), place_hash(place)
+        hit = cache.get(ck)
+        if hit:
+            # cached geo/pid let the dependent checks start right away; geocode
+            # itself still runs live in the fan-out so the key is really tested
+            ctx.geo, ctx.pid = hit["geo"], hit["pid"]
+            pending = SERVICES
+        else:
+            # geocode produces geo/pid for the dependent endpoints, so it runs first
+            r = HANDLERS["geocode"](ctx)
+            if r:
+                record("geocode", r)
+            if ctx.geo:
+                cache[ck] = {"geo": ctx.geo, "pid": ctx.pid, "formatted_address": r["info"]}
+                save_geocache(out_root, cache)
+            bar.update(1)
+            pending = SERVICES[1:]
+
+        if ctx.denied:
+            ready = []
+            reject_rest()
+        else:
+            ready = [svc for svc in pending
+                     if all(getattr(ctx, d) for d in HANDLERS[svc].deps)]
+        bar.update(len(pending) - len(ready))
+
+        # everything else is independent and I/O-bound, so fan it out on threads
+        if ready:
+            with ThreadPoolExecutor(max_workers=len(ready)) as pool:
+                futs = {pool.submit(HANDLERS[svc], ctx): svc for svc in ready}
+                # on a cache hit geocode is still in flight, so hold the other
+                # rows until it says whether the key itself was rejected
+                held = {} if "geocode" in ready else None
+                for fut in as_completed(futs):
+                    bar.update(1)
+                    svc, r = futs[fut], fut.result()
+                    if svc == "geocode":
+                        if r: record(svc, r)
+                        if ctx.denied:
+                            reject_rest()
+                        else:
+                            for hsvc, hr in held.items():
+                                if hr: record(hsvc, hr)
+                        held = None
+                    elif held is not None:
+                        held[svc] = r
+                    elif r and not ctx.denied:
+                        record(svc, r)
+
+    return {svc: ctx.results[svc] for svc in SERVICES if svc in ctx.results}
+
+def format_row(svc, r):
+    http = str(r["http"] or "").ljust(6)
+    return f"{svc[:15].ljust(15)}{http}  {r['info']}"
+
+def print_table(key, key_hash8, place, results):
+    print(f"\nKey {mask_key(key, key_hash8)}  Place \"{place}\"")
     print("-" * 60)
     print(f"{'API':15}{'HTTP':6}  Info")
     print("-" * 60)
     for svc, r in results.items():
-        http = str(r["http"] or "").ljust(6)
-        info = r["info"]
-        print(f"{svc[:15].ljust(15)}{http}  {info}")
+        print(format_row(svc, r))
         raw = r.get("raw")
         if raw is not None:
-            raw_str = json.dumps(raw, indent=2)
+            raw_str = orjson.dumps(raw).decode()
+            if INDENT + len(raw_str) > WIDTH:
+                raw_str = orjson.dumps(raw, option=orjson.OPT_INDENT_2).decode()
             for line in raw_str.splitlines():
-                print(" " * 23 + line)
+                print(" " * INDENT + line)
     print("-" * 60)
 
 def main():
@@ -242,11 +433,13 @@ def main():
     if not key or not place:
         print("API key and place are required."); sys.exit(1)
 
-    session  = make_session()
-    out_root = pathlib.Path("output") / hashlib.sha1(key.encode()).hexdigest()[:8]
-    results  = test_key_place(session, key, place, out_root)
+    key_hash8 = hashlib.sha1(key.encode()).hexdigest()[:8]
+    session   = make_session()
+    out_root  = pathlib.Path("output") / key_hash8
+    results   = test_key_place(session, key, place, out_root,
+                               probe_only="--probe-only" in sys.argv[1:])
 
-    print_table(key, place, results)
+    print_table(key, key_hash8, place, results)
 
 if __name__ == "__main__":
     main()